@@ -1,16 +1,57 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 from .models.user_models import User
+from .models.leave_models import LeaveRequest
 
 
-class CustomUserAdmin(UserAdmin):
+class EstimatedCountPaginator(Paginator):
+    """ Use PostgreSQL's planner estimate instead of COUNT(*) for large unfiltered tables """
+
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+class ScalableChangeListMixin:
+    """ Estimated-count pagination and a narrow column projection for changelists """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_only = None
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        opts = self.model._meta
+        match = request.resolver_match
+        # Only the changelist is projected; change forms need every column.
+        if self.list_only and match and match.url_name == f"{opts.app_label}_{opts.model_name}_changelist":
+            queryset = queryset.only(*self.list_only)
+        return queryset
+
+
+class CustomUserAdmin(ScalableChangeListMixin, UserAdmin):
     """ Custom admin panel for User model """
-    
+
     model = User
-    list_display = ("email", "first_name", "last_name", "group", "is_staff", "is_active")
-    list_filter = ("group", "is_staff", "is_active")
+    list_display = ("email", "first_name", "last_name", "group", "department", "is_staff", "is_active")
+    list_filter = ("group", "department", "is_staff", "is_active")
     ordering = ("email",)
-    search_fields = ("email", "first_name", "last_name")
+    # Exact email and name-prefix lookups are served by the expression indexes on User.
+    search_fields = ("=email", "^first_name", "^last_name")
+    list_only = ("id", "email", "first_name", "last_name", "group", "department", "is_staff", "is_active")
 
     fieldsets = (
         (None, {"fields": ("email", "password")}),
@@ -28,4 +69,22 @@ class CustomUserAdmin(UserAdmin):
     )
 
 
-admin.site.register(User, CustomUserAdmin)
\ No newline at end of file
+class LeaveRequestAdmin(ScalableChangeListMixin, admin.ModelAdmin):
+    """ Admin panel for leave requests """
+
+    list_display = ("id", "employee", "leave_type", "start_date", "end_date", "status", "applied_on", "reviewed_by")
+    list_filter = ("status", "leave_type", "employee__department")
+    list_select_related = ("employee", "reviewed_by")
+    ordering = ("-applied_on",)
+    search_fields = ("=employee__email",)
+    raw_id_fields = ("employee", "reviewed_by")
+    readonly_fields = ("applied_on",)
+    list_only = (
+        "id", "leave_type", "start_date", "end_date", "status", "applied_on",
+        "employee", "employee__email", "employee__first_name", "employee__last_name", "employee__group",
+        "reviewed_by", "reviewed_by__email", "reviewed_by__first_name", "reviewed_by__last_name", "reviewed_by__group",
+    )
+
+
+admin.site.register(User, CustomUserAdmin)
+admin.site.register(LeaveRequest, LeaveRequestAdmin)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PaysphereAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'paysphere_app'
+
+    def ready(self):
+        from . import reports  # noqa: F401  connects snapshot invalidation receivers
+        from . import revocation  # noqa: F401  connects password-change revocation receivers
@@ -1,5 +1,8 @@
 from django.contrib.auth.backends import BaseBackend
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from .revocation import revocation_store
 
 User = get_user_model()
 
@@ -17,4 +20,12 @@ class ActiveUserBackend(BaseBackend):
         try:
             return User.objects.get(pk=user_id)
         except User.DoesNotExist:
-            return None
\ No newline at end of file
+            return None
+
+class RevocationAwareJWTAuthentication(JWTAuthentication):
+    """JWT authentication that rejects tokens revoked on deactivation, password change or logout."""
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if revocation_store.is_revoked(validated_token):
+            raise InvalidToken("Token has been revoked.")
+        return validated_token
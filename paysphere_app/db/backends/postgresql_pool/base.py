@@ -0,0 +1,44 @@
+from django.db.backends.postgresql import base
+
+from paysphere_app.db.pool import PooledConnection, get_pool
+from .creation import DatabaseCreation
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend that borrows connections from a per-process pool.
+
+    Django still opens and closes its connection around each request (keep
+    ``CONN_MAX_AGE`` at 0); opening checks a connection out of the pool and
+    closing returns it. Pool limits come from the ``POOL`` key of the
+    database settings.
+    """
+
+    creation_class = DatabaseCreation
+
+    def get_pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        def connect():
+            connection = super(DatabaseWrapper, self).get_new_connection(conn_params)
+            return PooledConnection(connection, self.isolation_level)
+
+        pool = self.get_pool()
+        record = pool.checkout(connect)
+        self._checkout_pool = pool
+        self.isolation_level = record.isolation_level
+        return record.connection
+
+    def _close(self):
+        if self.connection is not None:
+            pool = getattr(self, "_checkout_pool", None)
+            with self.wrap_database_errors:
+                if pool is None:
+                    self.connection.close()
+                elif pool is not self.get_pool():
+                    # The settings changed since checkout (e.g. the test runner switched
+                    # NAME), so this connection must not go back to a pool for reuse.
+                    pool.discard(self.connection)
+                else:
+                    pool.checkin(self.connection)
+            self._checkout_pool = None
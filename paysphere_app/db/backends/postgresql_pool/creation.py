@@ -0,0 +1,15 @@
+from django.db.backends.postgresql import creation
+
+from paysphere_app.db.pool import close_pools
+
+
+class DatabaseCreation(creation.DatabaseCreation):
+    """Drain pooled connections before the test database is dropped or used as a template."""
+
+    def _destroy_test_db(self, test_database_name, verbosity):
+        close_pools(self.connection.alias)
+        super()._destroy_test_db(test_database_name, verbosity)
+
+    def _clone_test_db(self, suffix, verbosity, keepdb=False):
+        close_pools(self.connection.alias)
+        super()._clone_test_db(suffix, verbosity, keepdb)
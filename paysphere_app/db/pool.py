@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from ..metrics import registry
+
+
+class PooledConnection:
+    """A raw DB-API connection plus the bookkeeping the pool needs."""
+
+    def __init__(self, connection, isolation_level=None):
+        self.connection = connection
+        self.isolation_level = isolation_level
+        self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections for one database.
+
+    Checkout reuses the most recently returned connection, opens a new one
+    while below ``max_size``, or waits up to ``timeout`` seconds for a
+    checkin. Connections idle for longer than ``health_check_after`` are
+    probed with ``SELECT 1`` before being handed out, and connections idle
+    for longer than ``max_idle`` are closed.
+    """
+
+    def __init__(self, alias, max_size=10, timeout=5.0, max_idle=300.0, health_check_after=5.0, database=""):
+        self.alias = alias
+        self.labels = (("alias", alias), ("database", database or ""))
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.health_check_after = health_check_after
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._checked_out = {}
+        self._size = 0
+        registry.set("paysphere_db_pool_max_size", max_size, self.labels)
+        self._report()
+        # Reaping also runs on every checkout/checkin; this covers workers that go quiet.
+        self._reaper = threading.Thread(target=self._reap_forever, name=f"db-pool-reaper-{alias}", daemon=True)
+        self._reaper.start()
+
+    def checkout(self, connect):
+        """Return a ``PooledConnection``; ``connect`` opens a new one when needed."""
+        start = time.perf_counter()
+        deadline = start + self.timeout
+        record = None
+        with self._condition:
+            while True:
+                self._reap_idle()
+                if self._idle:
+                    record = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    registry.inc("paysphere_db_pool_timeouts_total", self.labels)
+                    raise psycopg2.OperationalError(
+                        f"Timed out after {self.timeout}s waiting for a connection from the '{self.alias}' pool."
+                    )
+                self._condition.wait(remaining)
+        registry.observe("paysphere_db_pool_wait_seconds", time.perf_counter() - start, self.labels)
+
+        if record is not None and not self._is_healthy(record):
+            self._close(record, "unhealthy")
+            record = None
+        if record is None:
+            try:
+                record = connect()
+            except Exception:
+                with self._condition:
+                    self._size -= 1
+                    self._condition.notify()
+                    self._report()
+                raise
+
+        with self._condition:
+            self._checked_out[id(record.connection)] = record
+            self._report()
+        return record
+
+    def checkin(self, connection):
+        """Return a connection to the pool, or close it if it cannot be reused."""
+        with self._condition:
+            record = self._checked_out.pop(id(connection), None)
+        if record is None:
+            connection.close()
+            return
+
+        reusable = not connection.closed
+        if reusable and connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                connection.rollback()
+            except psycopg2.Error:
+                reusable = False
+        if not reusable:
+            self._close(record, "broken")
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+                self._report()
+            return
+
+        record.last_used = time.monotonic()
+        with self._condition:
+            self._idle.append(record)
+            self._reap_idle()
+            self._condition.notify()
+            self._report()
+
+    def discard(self, connection):
+        """Close a checked-out connection for real instead of returning it."""
+        with self._condition:
+            record = self._checked_out.pop(id(connection), None)
+        if record is None:
+            connection.close()
+            return
+        self._close(record, "discarded")
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+            self._report()
+
+    def close_idle(self):
+        """Close every idle connection, e.g. before the database is dropped."""
+        with self._condition:
+            while self._idle:
+                self._close(self._idle.pop(), "drained")
+                self._size -= 1
+            self._condition.notify_all()
+            self._report()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "alias": self.alias,
+                "max_size": self.max_size,
+                "open": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+            }
+
+    def _is_healthy(self, record):
+        connection = record.connection
+        if connection.closed:
+            return False
+        if time.monotonic() - record.last_used < self.health_check_after:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            if connection.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+        except psycopg2.Error:
+            return False
+        return True
+
+    def _reap_forever(self):
+        while True:
+            time.sleep(max(self.max_idle / 2, 1.0))
+            with self._condition:
+                self._reap_idle()
+                self._report()
+
+    def _reap_idle(self):
+        # Called with the condition held; the oldest idle connections sit on the left.
+        now = time.monotonic()
+        while self._idle and now - self._idle[0].last_used > self.max_idle:
+            self._close(self._idle.popleft(), "idle")
+            self._size -= 1
+
+    def _close(self, record, reason):
+        registry.inc("paysphere_db_pool_discarded_total", self.labels + (("reason", reason),))
+        try:
+            record.connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _report(self):
+        idle = len(self._idle)
+        registry.set("paysphere_db_pool_connections", idle, self.labels + (("state", "idle"),))
+        registry.set("paysphere_db_pool_connections", self._size - idle, self.labels + (("state", "in_use"),))
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def pool_key(alias, settings_dict):
+    """Pools are per process and per target database, not just per alias.
+
+    Django's test runner rewrites ``NAME`` to the test database, so a pool
+    keyed on the alias alone would hand out connections to the wrong one.
+    """
+    return (
+        os.getpid(),
+        alias,
+        settings_dict.get("NAME"),
+        settings_dict.get("HOST"),
+        settings_dict.get("PORT"),
+        settings_dict.get("USER"),
+    )
+
+
+def get_pool(alias, settings_dict):
+    """Return this process's pool for the database ``settings_dict`` points at."""
+    key = pool_key(alias, settings_dict)
+    pool = _pools.get(key)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(key)
+            if pool is None:
+                options = settings_dict.get("POOL", {})
+                pool = _pools[key] = ConnectionPool(
+                    alias,
+                    max_size=options.get("MAX_SIZE", 10),
+                    timeout=options.get("TIMEOUT", 5.0),
+                    max_idle=options.get("MAX_IDLE", 300.0),
+                    health_check_after=options.get("HEALTH_CHECK_AFTER", 5.0),
+                    database=settings_dict.get("NAME"),
+                )
+    return pool
+
+
+def close_pools(alias):
+    """Close the idle connections of every pool this process holds for ``alias``."""
+    with _pools_lock:
+        pools = [pool for key, pool in _pools.items() if key[0] == os.getpid() and key[1] == alias]
+    for pool in pools:
+        pool.close_idle()
@@ -0,0 +1,49 @@
+import os
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from paysphere_app.profiling import PROFILE_SUFFIX, profile_action
+
+
+class Command(BaseCommand):
+    help = "Merge captured request profiles into one collapsed-stack file per view action."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=None, help="Directory holding captured profiles (defaults to PROFILING_DIR).")
+        parser.add_argument("--output", default=None, help="Directory for the merged files (defaults to <dir>/aggregated).")
+        parser.add_argument("--action", default=None, help="Only aggregate profiles for this view action.")
+
+    def handle(self, *args, **options):
+        directory = options["dir"] or settings.PROFILING_DIR
+        if not os.path.isdir(directory):
+            raise CommandError(f"Profile directory '{directory}' does not exist.")
+        output = options["output"] or os.path.join(directory, "aggregated")
+
+        stacks = defaultdict(Counter)
+        captured = Counter()
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(PROFILE_SUFFIX):
+                continue
+            action = profile_action(name)
+            if options["action"] and action != options["action"]:
+                continue
+            captured[action] += 1
+            with open(os.path.join(directory, name)) as handle:
+                for line in handle:
+                    stack, _, count = line.rstrip("\n").rpartition(" ")
+                    if stack and count.isdigit():
+                        stacks[action][stack] += int(count)
+
+        if not stacks:
+            self.stdout.write("No profiles found.")
+            return
+
+        os.makedirs(output, exist_ok=True)
+        for action, counts in sorted(stacks.items()):
+            path = os.path.join(output, f"{action}{PROFILE_SUFFIX}")
+            with open(path, "w") as handle:
+                for stack, count in counts.most_common():
+                    handle.write(f"{stack} {count}\n")
+            self.stdout.write(f"{action}: {captured[action]} profiles, {sum(counts.values())} samples -> {path}")
@@ -0,0 +1,58 @@
+import statistics
+import time
+
+import psycopg2
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from paysphere_app.db.pool import ConnectionPool, PooledConnection
+
+
+class Command(BaseCommand):
+    help = "Compare per-request connection setup against the connection pool on the configured PostgreSQL database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database alias to benchmark.")
+        parser.add_argument("--iterations", type=int, default=500, help="Requests to simulate per mode.")
+
+    def handle(self, *args, **options):
+        connection = connections[options["database"]]
+        if connection.vendor != "postgresql":
+            raise CommandError("The connection pool benchmark needs a PostgreSQL database.")
+        params = connection.get_connection_params()
+        iterations = options["iterations"]
+
+        def query(conn):
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+
+        direct = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            conn = psycopg2.connect(**params)
+            conn.autocommit = True
+            query(conn)
+            conn.close()
+            direct.append(time.perf_counter() - start)
+
+        pool = ConnectionPool(f"benchmark-{options['database']}", max_size=1)
+        pooled = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            record = pool.checkout(lambda: PooledConnection(psycopg2.connect(**params)))
+            record.connection.autocommit = True
+            query(record.connection)
+            pool.checkin(record.connection)
+            pooled.append(time.perf_counter() - start)
+
+        self.report("direct connect", direct)
+        self.report("pooled", pooled)
+        self.stdout.write(f"speedup (mean): {statistics.mean(direct) / statistics.mean(pooled):.1f}x")
+
+    def report(self, label, samples):
+        ordered = sorted(samples)
+        p50 = ordered[len(ordered) // 2] * 1000
+        p95 = ordered[int(len(ordered) * 0.95) - 1] * 1000
+        mean = statistics.mean(ordered) * 1000
+        self.stdout.write(f"{label:>15}: mean {mean:.2f} ms, p50 {p50:.2f} ms, p95 {p95:.2f} ms")
@@ -0,0 +1,278 @@
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from django.conf import settings
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class MetricsRegistry:
+    """Process-wide metrics registry.
+
+    Every thread writes into its own shard, so the hot path takes no lock;
+    shards are only merged when the registry is collected. Shards of threads
+    that have exited (e.g. the per-request executors of Django's ASGI
+    handler) are folded into a retired aggregate whenever a new shard is
+    created, so their number is bounded by the live threads. When
+    ``METRICS_MULTIPROC_DIR`` is set, each worker process periodically dumps
+    its merged state into that directory and a scrape from any worker merges
+    all of the dumps, so gunicorn/uvicorn workers report as one process.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._retired = {}
+        self._shards_lock = threading.Lock()
+        self._gauges = {}
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._flush_pid = None
+
+    def counter(self, name, documentation):
+        self._metrics[name] = ("counter", documentation, None)
+
+    def gauge(self, name, documentation):
+        self._metrics[name] = ("gauge", documentation, None)
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        self._metrics[name] = ("histogram", documentation, tuple(buckets))
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = {}
+            self._local.shard = shard
+            with self._shards_lock:
+                self._retire_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _retire_dead_shards(self):
+        # Called with the shards lock held; a dead thread can no longer write to its shard.
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for key, cell in shard.items():
+                    _merge_cell(self._retired, key, cell)
+        self._shards = live
+
+    def inc(self, name, labels=(), value=1):
+        shard = self._shard()
+        key = (name, tuple(labels))
+        cell = shard.get(key)
+        if cell is None:
+            shard[key] = [value]
+        else:
+            cell[0] += value
+
+    def set(self, name, value, labels=()):
+        """Set a process-level gauge; gauges from several workers are summed."""
+        self._gauges[(name, tuple(labels))] = [value]
+
+    def observe(self, name, value, labels=()):
+        buckets = self._metrics[name][2]
+        shard = self._shard()
+        key = (name, tuple(labels))
+        cell = shard.get(key)
+        if cell is None:
+            # One slot per bucket plus +Inf, then sum and count.
+            cell = shard[key] = [0] * (len(buckets) + 3)
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                break
+        else:
+            index = len(buckets)
+        cell[index] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def _collect_local(self):
+        with self._shards_lock:
+            self._retire_dead_shards()
+            shards = [shard for _, shard in self._shards]
+            retired = {key: list(cell) for key, cell in self._retired.items()}
+        merged = {key: list(cell) for key, cell in list(self._gauges.items())}
+        for key, cell in retired.items():
+            _merge_cell(merged, key, cell)
+        for shard in shards:
+            for key, cell in list(shard.items()):
+                _merge_cell(merged, key, list(cell))
+        return merged
+
+    def _dump_path(self, directory, pid=None):
+        return os.path.join(directory, f"metrics-{pid or os.getpid()}.json")
+
+    def flush(self):
+        """Write this process's merged state into the shared directory."""
+        directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        if not directory:
+            return
+        path = self._dump_path(directory)
+        if self._flush_pid != os.getpid():
+            # A dump under our pid belongs to an earlier process that reused it.
+            self._flush_pid = os.getpid()
+            mark_process_dead(os.getpid(), directory)
+            atexit.register(self._exit, directory)
+        payload = [[name, [list(pair) for pair in labels], cell]
+                   for (name, labels), cell in self._collect_local().items()]
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as handle:
+            json.dump(payload, handle)
+        os.replace(tmp_path, path)
+
+    def _exit(self, directory):
+        self.flush()
+        mark_process_dead(os.getpid(), directory)
+
+    def maybe_flush(self):
+        """Flush at most once per ``METRICS_FLUSH_INTERVAL`` seconds."""
+        if not getattr(settings, "METRICS_MULTIPROC_DIR", None):
+            return
+        interval = getattr(settings, "METRICS_FLUSH_INTERVAL", 1.0)
+        now = time.monotonic()
+        if now - self._last_flush < interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def is_gauge(self, name):
+        return self._metrics.get(name, ("counter",))[0] == "gauge"
+
+    def collect(self):
+        merged = self._collect_local()
+        directory = getattr(settings, "METRICS_MULTIPROC_DIR", None)
+        if directory:
+            own_path = self._dump_path(directory)
+            for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+                if path == own_path:
+                    continue
+                # Gauges describe a live process, so they are dropped once it is gone.
+                live = _dump_pid_alive(path)
+                try:
+                    with open(path) as handle:
+                        payload = json.load(handle)
+                except (OSError, ValueError):
+                    continue
+                for name, labels, cell in payload:
+                    if not live and self.is_gauge(name):
+                        continue
+                    key = (name, tuple(tuple(pair) for pair in labels))
+                    _merge_cell(merged, key, cell)
+        return merged
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format."""
+        samples = self.collect()
+        lines = []
+        for name, (kind, documentation, buckets) in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (sample_name, labels), cell in sorted(samples.items()):
+                if sample_name != name:
+                    continue
+                if kind in ("counter", "gauge"):
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(cell[0])}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(buckets + ("+Inf",), cell):
+                    cumulative += count
+                    bucket_labels = labels + (("le", _format_value(bound)),)
+                    lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(cell[-2])}")
+                lines.append(f"{name}_count{_format_labels(labels)} {cell[-1]}")
+        return "\n".join(lines) + "\n"
+
+
+def mark_process_dead(pid, directory=None):
+    """Archive a finished worker's dump: its counters are kept, its gauges dropped.
+
+    Call this from gunicorn's ``child_exit`` hook; workers also call it on
+    clean exit.
+    """
+    directory = directory or getattr(settings, "METRICS_MULTIPROC_DIR", None)
+    if not directory:
+        return
+    path = registry._dump_path(directory, pid)
+    try:
+        with open(path) as handle:
+            payload = json.load(handle)
+    except (OSError, ValueError):
+        return
+    payload = [entry for entry in payload if not registry.is_gauge(entry[0])]
+    archive_path = os.path.join(directory, f"metrics-dead-{pid}-{time.time_ns()}.json")
+    tmp_path = f"{archive_path}.tmp"
+    with open(tmp_path, "w") as handle:
+        json.dump(payload, handle)
+    os.replace(tmp_path, archive_path)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _dump_pid_alive(path):
+    name = os.path.basename(path)[len("metrics-"):-len(".json")]
+    if not name.isdigit():
+        return False
+    try:
+        os.kill(int(name), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _merge_cell(merged, key, cell):
+    existing = merged.get(key)
+    if existing is None:
+        merged[key] = list(cell)
+    else:
+        for index, value in enumerate(cell):
+            existing[index] += value
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and value.is_integer():
+        return repr(value)
+    return str(value)
+
+
+registry = MetricsRegistry()
+
+registry.counter("paysphere_requests_total", "Total HTTP requests by view action, method and status.")
+registry.counter("paysphere_request_errors_total", "HTTP requests by view action that ended in a 5xx or an exception.")
+registry.histogram("paysphere_request_duration_seconds", "Request latency by view action.")
+registry.histogram("paysphere_request_db_seconds", "Time spent in database queries per request by view action.")
+registry.histogram("paysphere_response_size_bytes", "Response body size by view action.", SIZE_BUCKETS)
+registry.histogram("paysphere_login_hash_seconds", "Time spent verifying password hashes on login.")
+registry.histogram("paysphere_db_pool_wait_seconds", "Time spent waiting to check out a pooled database connection.")
+registry.counter("paysphere_db_pool_timeouts_total", "Pooled connection checkouts that timed out.")
+registry.counter("paysphere_db_pool_discarded_total", "Pooled connections closed, by reason.")
+registry.gauge("paysphere_db_pool_connections", "Open pooled database connections by state.")
+registry.gauge("paysphere_db_pool_max_size", "Configured maximum pooled connections.")
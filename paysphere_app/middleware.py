@@ -0,0 +1,87 @@
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metrics import registry
+from .profiling import StackSampler, should_profile, write_profile
+
+
+class QueryTimer:
+    """Database execute wrapper that accumulates query time for a request."""
+
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.elapsed += time.perf_counter() - start
+
+
+STANDARD_METHODS = {"GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"}
+
+
+def get_method_label(request):
+    """Collapse non-standard HTTP methods so clients cannot mint new label values."""
+    return request.method if request.method in STANDARD_METHODS else "other"
+
+
+def get_action_name(request):
+    """Return the resolved URL name (e.g. ``leave-approve-leave``) for labelling."""
+    match = getattr(request, "resolver_match", None)
+    if match is None or not match.url_name:
+        return "unmatched"
+    return match.url_name
+
+
+class MetricsMiddleware:
+    """Record request count, errors, latency, DB time and response size per view action."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timer = QueryTimer()
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(timer):
+                response = self.get_response(request)
+        except Exception:
+            action = get_action_name(request)
+            registry.inc("paysphere_requests_total", (("action", action), ("method", get_method_label(request)), ("status", "500")))
+            registry.inc("paysphere_request_errors_total", (("action", action),))
+            raise
+        duration = time.perf_counter() - start
+
+        action = get_action_name(request)
+        registry.inc("paysphere_requests_total", (("action", action), ("method", get_method_label(request)), ("status", str(response.status_code))))
+        if response.status_code >= 500:
+            registry.inc("paysphere_request_errors_total", (("action", action),))
+        registry.observe("paysphere_request_duration_seconds", duration, (("action", action),))
+        registry.observe("paysphere_request_db_seconds", timer.elapsed, (("action", action),))
+        if not response.streaming:
+            registry.observe("paysphere_response_size_bytes", len(response.content), (("action", action),))
+        registry.maybe_flush()
+        return response
+
+
+class ProfilingMiddleware:
+    """Sample the call stack of opted-in requests and store it as collapsed stacks."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        sampler = StackSampler(threading.get_ident(), getattr(settings, "PROFILING_INTERVAL", 0.005))
+        sampler.start()
+        try:
+            return self.get_response(request)
+        finally:
+            write_profile(get_action_name(request), sampler.stop())
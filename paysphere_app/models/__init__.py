@@ -1,2 +1,4 @@
 from .user_models import *  
-from .leave_models import *
\ No newline at end of file
+from .leave_models import *
+from .token_models import *
+from .report_models import *
\ No newline at end of file
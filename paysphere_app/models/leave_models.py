@@ -24,6 +24,14 @@ class LeaveRequest(models.Model):
     applied_on = models.DateTimeField(auto_now_add=True)
     reviewed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="approved_leaves")
     reviewed_on = models.DateTimeField(null=True, blank=True)
+    # Requests applied for together share a batch_id and are reviewed as one unit.
+    batch_id = models.UUIDField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', '-applied_on']),
+            models.Index(fields=['leave_type']),
+        ]
 
     def __str__(self):
         return f"{self.employee.email} - {self.leave_type} ({self.status})"
\ No newline at end of file
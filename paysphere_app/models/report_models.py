@@ -0,0 +1,8 @@
+from django.db import models
+
+class ReportDataVersion(models.Model):
+    # Single row shared by every worker; bumped after each write that can change a leave report.
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"Report data version {self.version}"
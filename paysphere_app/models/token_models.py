@@ -0,0 +1,23 @@
+from django.db import models
+from django.conf import settings
+
+class TokenRevocation(models.Model):
+    REASON_CHOICES = [
+        ('DEACTIVATED', 'User deactivated'),
+        ('PASSWORD_CHANGED', 'Password changed'),
+        ('LOGOUT', 'Logout'),
+    ]
+
+    # A row without a jti revokes every token issued to the user before revoked_at.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="token_revocations")
+    jti = models.CharField(max_length=255, null=True, blank=True, db_index=True)
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'revoked_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.reason} ({self.jti or 'all tokens'})"
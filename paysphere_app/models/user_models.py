@@ -1,5 +1,7 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.contrib.postgres.indexes import OpClass
 from django.db import models
+from django.db.models.functions import Upper
 
 
 class CustomUserManager(BaseUserManager):
@@ -65,6 +67,15 @@ class User(AbstractUser):
 
     objects = CustomUserManager()  
 
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # Match the UPPER(...) lookups Django emits for iexact/istartswith on PostgreSQL.
+            models.Index(Upper("email"), name="user_email_upper_idx"),
+            models.Index(OpClass(Upper("first_name"), name="text_pattern_ops"), name="user_first_name_prefix_idx"),
+            models.Index(OpClass(Upper("last_name"), name="text_pattern_ops"), name="user_last_name_prefix_idx"),
+            models.Index(fields=["department"], name="user_department_idx"),
+        ]
+
     def save(self, *args, **kwargs):
         if self.total_leaves < 0:
             self.total_leaves = 0
@@ -0,0 +1,106 @@
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core import signing
+
+
+PROFILE_HEADER = "HTTP_X_PAYSPHERE_PROFILE"
+PROFILE_SALT = "paysphere.profile"
+PROFILE_SUFFIX = ".folded"
+
+
+def sign_profile_request():
+    """Return a short-lived token for the ``X-Paysphere-Profile`` request header."""
+    return signing.TimestampSigner(salt=PROFILE_SALT).sign("profile")
+
+
+def should_profile(request):
+    """Profile a request when it carries a valid signed header or wins the sampling draw."""
+    token = request.META.get(PROFILE_HEADER)
+    if token:
+        max_age = getattr(settings, "PROFILING_TOKEN_MAX_AGE", 300)
+        try:
+            signing.TimestampSigner(salt=PROFILE_SALT).unsign(token, max_age=max_age)
+            return True
+        except signing.BadSignature:
+            pass
+    rate = getattr(settings, "PROFILING_SAMPLE_RATE", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+class StackSampler:
+    """Periodically sample the stack of one thread into collapsed-stack counts."""
+
+    def __init__(self, thread_id, interval=0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="paysphere-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+
+def write_profile(action, stacks):
+    """Write collapsed stacks for one request and rotate the profile directory by size."""
+    if not stacks:
+        return None
+    directory = settings.PROFILING_DIR
+    os.makedirs(directory, exist_ok=True)
+    filename = f"{action}.{time.time_ns()}.{os.getpid()}{PROFILE_SUFFIX}"
+    path = os.path.join(directory, filename)
+    with open(path, "w") as handle:
+        for stack, count in stacks.items():
+            handle.write(f"{stack} {count}\n")
+    rotate_profiles(directory, getattr(settings, "PROFILING_MAX_BYTES", 50 * 1024 * 1024))
+    return path
+
+
+def rotate_profiles(directory, max_bytes):
+    """Delete the oldest profiles until the directory fits within ``max_bytes``."""
+    entries = []
+    for name in os.listdir(directory):
+        if not name.endswith(PROFILE_SUFFIX):
+            continue
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+        total -= size
+
+
+def profile_action(filename):
+    """Return the view action a profile file was captured for."""
+    return filename.split(".", 1)[0]
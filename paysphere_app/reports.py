@@ -0,0 +1,247 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models.leave_models import LeaveRequest
+from .models.report_models import ReportDataVersion
+from .models.user_models import User
+from .signals import users_bulk_updated
+
+
+GROUP_FIELDS = ("department", "designation", "leave_type", "month")
+USER_FIELDS = ("department", "designation")
+UNASSIGNED = "Unassigned"
+
+
+def _encode(*columns):
+    """Encode several string columns against one shared label space."""
+    values = np.array([value or UNASSIGNED for column in columns for value in column], dtype=object)
+    if len(values) == 0:
+        return np.array([], dtype=object), [np.array([], dtype=np.int64) for _ in columns]
+    labels, codes = np.unique(values.astype(str), return_inverse=True)
+    codes = codes.astype(np.int64)
+    split, offset = [], 0
+    for column in columns:
+        split.append(codes[offset:offset + len(column)])
+        offset += len(column)
+    return labels, split
+
+
+class LeaveSnapshot:
+    """Columnar copy of the leave and user data needed for one report period.
+
+    Leave ranges are clipped to the period so day counts only cover the
+    requested window. Department and designation share a label space with
+    the active-user columns so headcounts line up with leave groups.
+    """
+
+    def __init__(self, start, end, status):
+        self.start = np.datetime64(start, "D")
+        self.end = np.datetime64(end, "D")
+        self.status = status
+        self.loaded_at = time.monotonic()
+
+        leaves = list(
+            LeaveRequest.objects
+            .filter(status=status, start_date__lte=end, end_date__gte=start)
+            .values_list("employee__department", "employee__designation", "leave_type", "start_date", "end_date")
+        )
+        users = list(User.objects.filter(is_active=True).values_list("department", "designation"))
+        leave_columns = list(zip(*leaves)) or [()] * 5
+        user_columns = list(zip(*users)) or [()] * 2
+
+        self.labels = {}
+        self.codes = {}
+        self.user_codes = {}
+        for index, field in enumerate(USER_FIELDS):
+            labels, (leave_codes, user_codes) = _encode(leave_columns[index], user_columns[index])
+            self.labels[field] = labels
+            self.codes[field] = leave_codes
+            self.user_codes[field] = user_codes
+        self.labels["leave_type"], (self.codes["leave_type"],) = _encode(leave_columns[2])
+
+        starts = np.array(leave_columns[3], dtype="datetime64[D]")
+        ends = np.array(leave_columns[4], dtype="datetime64[D]")
+        self.starts = np.maximum(starts, self.start)
+        self.ends = np.minimum(ends, self.end)
+
+        first_month = self.start.astype("datetime64[M]")
+        last_month = self.end.astype("datetime64[M]")
+        months = np.arange(first_month, last_month + 1)
+        self.labels["month"] = np.array([str(month) for month in months], dtype=object)
+        # Days of each month that fall inside the period.
+        month_starts = np.maximum(months.astype("datetime64[D]"), self.start)
+        month_ends = np.minimum((months + 1).astype("datetime64[D]") - 1, self.end)
+        self.month_days = (month_ends - month_starts).astype(np.int64) + 1
+        self.first_month = first_month
+
+    @property
+    def period_days(self):
+        return int((self.end - self.start).astype(np.int64)) + 1
+
+    def utilization(self, group_by):
+        """Leave days, request counts and absenteeism rate grouped by ``group_by``."""
+        lengths = np.maximum((self.ends - self.starts).astype(np.int64) + 1, 0)
+        dims = tuple(len(self.labels[field]) for field in group_by)
+        cells = int(np.prod(dims)) if dims else 1
+
+        request_codes = []
+        day_codes = []
+        if "month" in group_by:
+            # Expand every range into its individual days so months are split exactly.
+            total = int(lengths.sum())
+            row_of_day = np.repeat(np.arange(len(lengths)), lengths)
+            offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+            days = self.starts[row_of_day] + offsets
+            day_months = (days.astype("datetime64[M]") - self.first_month).astype(np.int64)
+            start_months = (self.starts.astype("datetime64[M]") - self.first_month).astype(np.int64)
+        for field in group_by:
+            if field == "month":
+                request_codes.append(start_months)
+                day_codes.append(day_months)
+            else:
+                request_codes.append(self.codes[field])
+                if "month" in group_by:
+                    day_codes.append(self.codes[field][row_of_day])
+
+        if not len(lengths) or not cells:
+            leave_days = requests = np.zeros(cells, dtype=np.int64)
+        elif dims:
+            request_keys = np.ravel_multi_index(request_codes, dims)
+            requests = np.bincount(request_keys, minlength=cells)
+            if "month" in group_by:
+                leave_days = np.bincount(np.ravel_multi_index(day_codes, dims), minlength=cells)
+            else:
+                leave_days = np.bincount(request_keys, weights=lengths, minlength=cells).astype(np.int64)
+        else:
+            requests = np.array([len(lengths)])
+            leave_days = np.array([int(lengths.sum())])
+
+        if cells:
+            capacity = self._capacity(group_by, dims).reshape(-1)
+            rates = np.divide(leave_days, capacity, out=np.zeros(cells), where=capacity > 0)
+
+        rows = []
+        for key in np.flatnonzero(leave_days):
+            row = {}
+            if dims:
+                for field, code in zip(group_by, np.unravel_index(key, dims)):
+                    row[field] = str(self.labels[field][code])
+            row["requests"] = int(requests[key])
+            row["leave_days"] = int(leave_days[key])
+            row["absenteeism_rate"] = round(float(rates[key]), 6)
+            rows.append(row)
+
+        headcount = len(self.user_codes["department"])
+        total_days = int(lengths.sum())
+        total_capacity = headcount * self.period_days
+        return {
+            "start": str(self.start),
+            "end": str(self.end),
+            "status": self.status,
+            "group_by": list(group_by),
+            "headcount": headcount,
+            "leave_days": total_days,
+            "absenteeism_rate": round(total_days / total_capacity, 6) if total_capacity else 0.0,
+            "rows": rows,
+        }
+
+    def _capacity(self, group_by, dims):
+        """Employee-days available in each group: headcount times days in the bucket."""
+        user_fields = [field for field in group_by if field in USER_FIELDS]
+        if user_fields:
+            user_dims = tuple(len(self.labels[field]) for field in user_fields)
+            user_keys = np.ravel_multi_index([self.user_codes[field] for field in user_fields], user_dims)
+            headcount = np.bincount(user_keys, minlength=int(np.prod(user_dims))).reshape(user_dims)
+        else:
+            headcount = np.array(len(self.user_codes["department"]))
+
+        shape = [1] * len(group_by)
+        for field in user_fields:
+            shape[group_by.index(field)] = len(self.labels[field])
+        capacity = headcount.reshape(shape) if group_by else headcount
+
+        if "month" in group_by:
+            month_shape = [1] * len(group_by)
+            month_shape[group_by.index("month")] = len(self.month_days)
+            capacity = capacity * self.month_days.reshape(month_shape)
+        else:
+            capacity = capacity * self.period_days
+        return np.broadcast_to(capacity, dims).astype(np.float64)
+
+
+REPORT_USER_FIELDS = {"department", "designation", "is_active"}
+
+
+def data_version():
+    """Shared counter of writes that can change a report; a primary-key lookup."""
+    return ReportDataVersion.objects.filter(pk=1).values_list("version", flat=True).first() or 0
+
+
+def bump_data_version():
+    if not ReportDataVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        ReportDataVersion.objects.get_or_create(pk=1, defaults={"version": 1})
+
+
+class SnapshotCache:
+    """Small per-process LRU of snapshots keyed by period and status.
+
+    Each lookup compares the snapshot's ``data_version()`` with the current
+    one, so a write handled by any worker invalidates every worker's copy.
+    Writes the receivers below cannot see (``bulk_create``, ``update``) must
+    call ``invalidate()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshots = OrderedDict()
+
+    def get(self, start, end, status):
+        key = (start, end, status)
+        ttl = getattr(settings, "REPORT_SNAPSHOT_TTL", 300)
+        version = data_version()
+        with self._lock:
+            snapshot = self._snapshots.get(key)
+            if snapshot is not None and snapshot.version == version and time.monotonic() - snapshot.loaded_at < ttl:
+                self._snapshots.move_to_end(key)
+                return snapshot
+
+        snapshot = LeaveSnapshot(start, end, status)
+        snapshot.version = version
+        with self._lock:
+            self._snapshots[key] = snapshot
+            self._snapshots.move_to_end(key)
+            while len(self._snapshots) > getattr(settings, "REPORT_SNAPSHOT_CACHE_SIZE", 8):
+                self._snapshots.popitem(last=False)
+        return snapshot
+
+    def invalidate(self):
+        """Bump the shared data version once the current transaction commits."""
+        transaction.on_commit(bump_data_version)
+
+
+snapshot_cache = SnapshotCache()
+
+
+@receiver([post_save, post_delete], sender=LeaveRequest)
+def invalidate_leave_snapshots(sender, instance, **kwargs):
+    snapshot_cache.invalidate()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_snapshots(sender, instance, update_fields=None, **kwargs):
+    # Headcounts depend on these fields only; e.g. a last_login update is ignored.
+    if update_fields is None or REPORT_USER_FIELDS.intersection(update_fields):
+        snapshot_cache.invalidate()
+
+
+@receiver(users_bulk_updated)
+def invalidate_bulk_user_snapshots(sender, **kwargs):
+    snapshot_cache.invalidate()
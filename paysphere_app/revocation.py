@@ -0,0 +1,177 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models.token_models import TokenRevocation
+from .models.user_models import User
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over string keys."""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+def _jti_key(jti):
+    return f"jti:{jti}"
+
+
+class RevocationStore:
+    """Per-worker view of ``TokenRevocation`` backed by a bloom filter.
+
+    At most once per ``TOKEN_REVOCATION_REFRESH_INTERVAL`` seconds the filter
+    is topped up with every row revoked since the previous refresh minus
+    ``TOKEN_REVOCATION_REFRESH_GRACE`` seconds. The grace window re-reads rows
+    whose transactions committed late, so ids committed out of order are not
+    skipped. Every ``TOKEN_REVOCATION_REBUILD_INTERVAL`` seconds the filter is
+    rebuilt from scratch, which drops revocations older than the refresh
+    token lifetime and deletes their rows, since every token they cover has
+    expired by then. Only filter hits hit the database.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._filter = None
+        self._refreshed_at = None
+        self._next_refresh = 0.0
+        self._next_rebuild = 0.0
+
+    def _new_filter(self):
+        return BloomFilter(
+            getattr(settings, "TOKEN_REVOCATION_BLOOM_CAPACITY", 100000),
+            getattr(settings, "TOKEN_REVOCATION_BLOOM_ERROR_RATE", 0.001),
+        )
+
+    def _add_row(self, bloom, user_id, jti):
+        bloom.add(_jti_key(jti) if jti else _user_key(user_id))
+
+    def _load(self, bloom, since):
+        rows = TokenRevocation.objects.filter(revoked_at__gte=since).values_list('user_id', 'jti')
+        for user_id, jti in rows.iterator():
+            self._add_row(bloom, user_id, jti)
+
+    def _rebuild(self):
+        refreshed_at = timezone.now()
+        since = refreshed_at - api_settings.REFRESH_TOKEN_LIFETIME
+        grace = timedelta(seconds=getattr(settings, "TOKEN_REVOCATION_REFRESH_GRACE", 300))
+        TokenRevocation.objects.filter(revoked_at__lt=since - grace).delete()
+        bloom = self._new_filter()
+        self._load(bloom, since)
+        self._filter = bloom
+        self._refreshed_at = refreshed_at
+
+    def _top_up(self):
+        refreshed_at = timezone.now()
+        grace = timedelta(seconds=getattr(settings, "TOKEN_REVOCATION_REFRESH_GRACE", 300))
+        self._load(self._filter, self._refreshed_at - grace)
+        self._refreshed_at = refreshed_at
+
+    def refresh(self):
+        now = time.monotonic()
+        if now < self._next_refresh:
+            return
+        with self._lock:
+            if now < self._next_refresh:
+                return
+            if self._filter is None or now >= self._next_rebuild:
+                self._rebuild()
+                self._next_rebuild = now + getattr(settings, "TOKEN_REVOCATION_REBUILD_INTERVAL", 3600)
+            else:
+                self._top_up()
+            self._next_refresh = now + getattr(settings, "TOKEN_REVOCATION_REFRESH_INTERVAL", 5)
+
+    def is_revoked(self, token):
+        """Return True if the validated token has been revoked."""
+        self.refresh()
+        bloom = self._filter
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        jti = token.get(api_settings.JTI_CLAIM)
+        user_hit = user_id is not None and _user_key(user_id) in bloom
+        jti_hit = jti is not None and _jti_key(jti) in bloom
+        if not user_hit and not jti_hit:
+            return False
+
+        query = Q()
+        if jti_hit:
+            query |= Q(jti=jti)
+        if user_hit:
+            user_query = Q(user_id=user_id, jti__isnull=True)
+            issued_at = token.get("iat")
+            if issued_at is not None:
+                # iat has whole-second precision, so compare at second precision: a token
+                # issued in the same second as the revocation (e.g. re-login right after a
+                # password change) stays valid, and tokens from earlier seconds are revoked.
+                user_query &= Q(revoked_at__gte=datetime.fromtimestamp(int(issued_at) + 1, tz=dt_timezone.utc))
+            query |= user_query
+        return TokenRevocation.objects.filter(query).exists()
+
+    def revoke(self, user_id, reason, jti=None):
+        """Record a revocation and add it to this worker's filter immediately."""
+        TokenRevocation.objects.create(user_id=user_id, jti=jti, reason=reason)
+        self._remember(user_id, jti)
+
+    def revoke_users(self, user_ids, reason):
+        """Revoke every token issued to each of ``user_ids`` with one insert."""
+        TokenRevocation.objects.bulk_create([TokenRevocation(user_id=user_id, reason=reason) for user_id in user_ids])
+        for user_id in user_ids:
+            self._remember(user_id, None)
+
+    def _remember(self, user_id, jti):
+        with self._lock:
+            if self._filter is not None:
+                self._add_row(self._filter, user_id, jti)
+
+
+revocation_store = RevocationStore()
+
+
+@receiver(post_init, sender=User)
+def remember_password_hash(sender, instance, **kwargs):
+    # Read __dict__ directly so a deferred password is not fetched for every user loaded.
+    instance._loaded_password = instance.__dict__.get("password")
+
+
+@receiver(post_save, sender=User)
+def revoke_on_password_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """Revoke a user's tokens whenever a save changes their password hash, wherever it was set."""
+    loaded_password = getattr(instance, "_loaded_password", None)
+    password = instance.__dict__.get("password")
+    instance._loaded_password = password
+    if created or raw:
+        return
+    if update_fields is not None and "password" not in update_fields:
+        return
+    # set_password() leaves the raw password in _password until save() finishes.
+    set_via_set_password = getattr(instance, "_password", None) is not None
+    hash_changed = loaded_password is not None and password != loaded_password
+    if set_via_set_password or hash_changed:
+        revocation_store.revoke(instance.pk, "PASSWORD_CHANGED")
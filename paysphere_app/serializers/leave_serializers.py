@@ -1,12 +1,16 @@
 from rest_framework import serializers
 from paysphere_app.models.leave_models import LeaveRequest
 from datetime import date
+import uuid
+
+# Bounds the in-memory overlap check and the size of one bulk insert.
+MAX_BATCH_RANGES = 31
 
 class LeaveRequestSerializer(serializers.ModelSerializer):
     class Meta:
         model = LeaveRequest
-        fields = ['employee_id', 'leave_type', 'start_date', 'end_date', 'reason', 'status', 'applied_on']
-        read_only_fields = ['status', 'applied_on']
+        fields = ['employee_id', 'leave_type', 'start_date', 'end_date', 'reason', 'status', 'applied_on', 'batch_id']
+        read_only_fields = ['status', 'applied_on', 'batch_id']
 
     def validate(self, data):
         user = self.context['request'].user  
@@ -43,4 +47,65 @@ class LeaveRequestSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data['employee'] = self.context['request'].user  
         return super().create(validated_data)
-    
\ No newline at end of file
+
+
+class LeaveRangeSerializer(serializers.Serializer):
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+
+    def validate(self, data):
+        if data['start_date'] > data['end_date']:
+            raise serializers.ValidationError("Start date must be before end date.")
+
+        if data['start_date'] < date.today():
+            raise serializers.ValidationError("You cannot request leave for past dates.")
+
+        return data
+
+
+class LeaveBatchSerializer(serializers.Serializer):
+    leave_type = serializers.ChoiceField(choices=LeaveRequest.LEAVE_TYPES)
+    reason = serializers.CharField()
+    ranges = serializers.ListField(child=LeaveRangeSerializer(), allow_empty=False, max_length=MAX_BATCH_RANGES)
+
+    def validate_ranges(self, value):
+        ranges = sorted(value, key=lambda r: r['start_date'])
+
+        for previous, current in zip(ranges, ranges[1:]):
+            if current['start_date'] <= previous['end_date']:
+                raise serializers.ValidationError(f"Ranges overlap around {current['start_date']}.")
+
+        # One range query covers every requested range; the exact check runs in memory.
+        existing = LeaveRequest.objects.filter(
+            employee=self.context['request'].user,
+            start_date__lte=ranges[-1]['end_date'],
+            end_date__gte=ranges[0]['start_date']
+        ).values_list('start_date', 'end_date')
+
+        for start_date, end_date in existing:
+            for leave_range in ranges:
+                if start_date <= leave_range['end_date'] and end_date >= leave_range['start_date']:
+                    raise serializers.ValidationError(
+                        f"You already have a leave overlapping {leave_range['start_date']} - {leave_range['end_date']}."
+                    )
+
+        return ranges
+
+    @property
+    def total_days(self):
+        return sum((r['end_date'] - r['start_date']).days + 1 for r in self.validated_data['ranges'])
+
+    def create(self, validated_data):
+        employee = self.context['request'].user
+        batch_id = uuid.uuid4()
+        return LeaveRequest.objects.bulk_create([
+            LeaveRequest(
+                employee=employee,
+                leave_type=validated_data['leave_type'],
+                reason=validated_data['reason'],
+                start_date=leave_range['start_date'],
+                end_date=leave_range['end_date'],
+                batch_id=batch_id,
+            )
+            for leave_range in validated_data['ranges']
+        ])
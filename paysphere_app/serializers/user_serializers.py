@@ -2,7 +2,9 @@ from rest_framework import serializers
 from django.contrib.auth.hashers import make_password, check_password
 from django.contrib.auth import authenticate
 from ..models.user_models import User
+from ..metrics import registry
 import re
+import time
 from datetime import date
 
 class UserSerializer(serializers.ModelSerializer):
@@ -136,11 +138,32 @@ class UserLoginSerializer(serializers.Serializer):
         except User.DoesNotExist:
             raise serializers.ValidationError("Invalid email or password.")
 
-        if not check_password(password, user.password):
+        start = time.perf_counter()
+        password_ok = check_password(password, user.password)
+        registry.observe("paysphere_login_hash_seconds", time.perf_counter() - start)
+
+        if not password_ok:
             raise serializers.ValidationError("Invalid email or password.")
 
         if not user.is_active:
             raise serializers.ValidationError("Your account is inactive. Please contact admin.")
 
         data["user"] = user
-        return data
\ No newline at end of file
+        return data
+
+
+class UserBulkUpdateSerializer(serializers.Serializer):
+    """Select users by id list or department and the fields to set on all of them"""
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    department = serializers.CharField(required=False)
+    is_active = serializers.BooleanField(required=False)
+    group = serializers.ChoiceField(choices=User.GROUP_CHOICES, required=False)
+
+    def validate(self, data):
+        if ('ids' in data) == ('department' in data):
+            raise serializers.ValidationError("Provide either 'ids' or 'department'.")
+
+        if 'is_active' not in data and 'group' not in data:
+            raise serializers.ValidationError("Provide 'is_active' and/or 'group' to update.")
+
+        return data
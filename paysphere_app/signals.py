@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent once per bulk user update with ``user_ids`` and ``fields`` so caches can
+# invalidate in one pass instead of reacting to per-row save signals.
+users_bulk_updated = Signal()
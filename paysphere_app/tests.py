@@ -1,3 +1,426 @@
-from django.test import TestCase
+import threading
+import time
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .metrics import MetricsRegistry
+from .reports import LeaveSnapshot, SnapshotCache
+from .models.leave_models import LeaveRequest
+from .models.token_models import TokenRevocation
+from .models.user_models import User
+from .revocation import RevocationStore
+from .signals import users_bulk_updated
+from .db.pool import close_pools, get_pool
+
+
+class TokenRevocationTests(TestCase):
+    """Tokens are rejected after deactivation, password change and logout."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.hr = User.objects.create_superuser(email="hr@example.com", password="Hr@12345", first_name="Hr", last_name="Admin")
+        self.user = User.objects.create_user(email="emp@example.com", password="Emp@12345", first_name="Emp", last_name="Loyee")
+
+    def old_token(self, user, age=10):
+        """An access token issued ``age`` seconds ago, i.e. before any revocation made now."""
+        token = AccessToken.for_user(user)
+        token["iat"] = int(time.time()) - age
+        return str(token)
+
+    def login(self, email, password):
+        response = self.client.post("/api/users/login/", {"email": email, "password": password}, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def get_current(self, access_token):
+        return self.client.get("/api/users/current/", HTTP_AUTHORIZATION=f"Bearer {access_token}")
+
+    def as_hr(self):
+        return {"HTTP_AUTHORIZATION": f"Bearer {self.login('hr@example.com', 'Hr@12345')['access_token']}"}
+
+    def test_deactivated_user_token_is_rejected(self):
+        token = self.old_token(self.user)
+        self.assertEqual(self.get_current(token).status_code, 200)
+
+        response = self.client.delete(f"/api/users/{self.user.id}/deactivate/", **self.as_hr())
+        self.assertEqual(response.status_code, 204)
+
+        self.assertEqual(self.get_current(token).status_code, 401)
+
+    def test_token_issued_after_reactivation_is_accepted(self):
+        old_token = self.old_token(self.user)
+        hr = self.as_hr()
+        self.client.delete(f"/api/users/{self.user.id}/deactivate/", **hr)
+        self.client.patch(f"/api/users/{self.user.id}/activate/", **hr)
+
+        new_token = self.login("emp@example.com", "Emp@12345")["access_token"]
+
+        self.assertEqual(self.get_current(new_token).status_code, 200)
+        self.assertEqual(self.get_current(old_token).status_code, 401)
+
+    def test_password_change_revokes_existing_tokens(self):
+        token = self.old_token(self.user)
+
+        self.user.set_password("New@12345")
+        self.user.save()
+
+        self.assertEqual(self.get_current(token).status_code, 401)
+
+    def test_logout_revokes_access_token(self):
+        tokens = self.login("emp@example.com", "Emp@12345")
+        access_token = tokens["access_token"]
+
+        response = self.client.post(
+            "/api/users/logout/",
+            {"refresh_token": tokens["refresh_token"]},
+            format="json",
+            HTTP_AUTHORIZATION=f"Bearer {access_token}",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get_current(access_token).status_code, 401)
+
+    def test_bloom_miss_runs_no_query(self):
+        store = RevocationStore()
+        store.refresh()
+        token = AccessToken.for_user(self.user)
+
+        with self.assertNumQueries(0):
+            self.assertFalse(store.is_revoked(token))
+
+    def test_rebuild_deletes_expired_revocations(self):
+        expired = TokenRevocation.objects.create(user=self.user, reason="LOGOUT", jti="expired")
+        TokenRevocation.objects.create(user=self.user, reason="LOGOUT", jti="current")
+        cutoff = timezone.now() - api_settings.REFRESH_TOKEN_LIFETIME - timedelta(days=1)
+        TokenRevocation.objects.filter(pk=expired.pk).update(revoked_at=cutoff)
+
+        RevocationStore().refresh()
+
+        self.assertEqual(list(TokenRevocation.objects.values_list("jti", flat=True)), ["current"])
+
+
+class UserBulkUpdateTests(TestCase):
+    """Bulk activation and role changes are one set-based UPDATE."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.hr = User.objects.create_superuser(
+            email="hr@example.com", password="Hr@12345", first_name="Hr", last_name="Admin", department="People"
+        )
+        self.client.force_authenticate(user=self.hr)
+        self.engineers = [
+            User.objects.create_user(email=f"eng{i}@example.com", password="Emp@12345", department="Engineering")
+            for i in range(3)
+        ]
+        self.other = User.objects.create_user(email="ops@example.com", password="Emp@12345", department="Operations")
+
+    def bulk_update(self, data):
+        return self.client.post("/api/users/bulk-update/", data, format="json")
+
+    def test_ids_and_department_are_exclusive(self):
+        both = self.bulk_update({"ids": [self.other.id], "department": "Engineering", "is_active": False})
+        neither = self.bulk_update({"is_active": False})
+
+        self.assertEqual(both.status_code, 400)
+        self.assertEqual(neither.status_code, 400)
+        self.assertTrue(User.objects.get(pk=self.other.pk).is_active)
+
+    def test_runs_one_update_without_calling_save(self):
+        with mock.patch.object(User, "save") as save, CaptureQueriesContext(connection) as queries:
+            response = self.bulk_update({"department": "Engineering", "group": "HR"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["updated"], 3)
+        save.assert_not_called()
+        updates = [query["sql"] for query in queries if query["sql"].startswith(f'UPDATE "{User._meta.db_table}"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(User.objects.filter(department="Engineering", group="HR").count(), 3)
+        self.assertEqual(User.objects.get(pk=self.other.pk).group, "EMPLOYEE")
+
+    def test_requesting_user_is_excluded(self):
+        response = self.bulk_update({"ids": [self.hr.id, self.other.id], "is_active": False})
+
+        self.assertEqual(response.data["updated"], 1)
+        self.assertTrue(User.objects.get(pk=self.hr.pk).is_active)
+        self.assertFalse(User.objects.get(pk=self.other.pk).is_active)
+
+    def test_deactivate_inserts_user_wide_revocations(self):
+        self.bulk_update({"department": "Engineering", "is_active": False})
+
+        revoked = TokenRevocation.objects.filter(reason="DEACTIVATED", jti__isnull=True)
+        self.assertCountEqual(revoked.values_list("user_id", flat=True), [user.id for user in self.engineers])
+
+    def test_signal_is_sent_once_with_affected_ids(self):
+        handler = mock.Mock()
+        users_bulk_updated.connect(handler)
+        self.addCleanup(users_bulk_updated.disconnect, handler)
+
+        self.bulk_update({"department": "Engineering", "is_active": False})
+
+        handler.assert_called_once()
+        kwargs = handler.call_args.kwargs
+        self.assertCountEqual(kwargs["user_ids"], [user.id for user in self.engineers])
+        self.assertEqual(kwargs["fields"], ["is_active", "modified_at", "modified_by"])
+
+
+class LeaveUtilizationReportTests(TestCase):
+    """The utilization report endpoint and the snapshot math behind it."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.hr = User.objects.create_superuser(email="hr@example.com", password="Hr@12345", first_name="Hr", last_name="Admin")
+        self.client.force_authenticate(user=self.hr)
+
+        developer = User.objects.create_user(email="dev@example.com", department="Engineering", designation="Developer")
+        tester = User.objects.create_user(email="qa@example.com", department="Engineering", designation="Tester")
+        seller = User.objects.create_user(email="sales@example.com", department="Sales", designation="Developer")
+        for employee, leave_type, start_date, end_date, status in [
+            (developer, "SICK", date(2023, 12, 30), date(2024, 1, 2), "APPROVED"),  # clipped to Jan 1-2
+            (developer, "ANNUAL", date(2024, 1, 30), date(2024, 2, 2), "APPROVED"),  # split across Jan and Feb
+            (seller, "CASUAL", date(2024, 3, 30), date(2024, 4, 5), "APPROVED"),  # clipped to Mar 30-31
+            (tester, "SICK", date(2024, 2, 10), date(2024, 2, 10), "APPROVED"),
+            (tester, "SICK", date(2024, 3, 1), date(2024, 3, 5), "PENDING"),
+        ]:
+            LeaveRequest.objects.create(
+                employee=employee, leave_type=leave_type, start_date=start_date, end_date=end_date, status=status, reason="Test"
+            )
+
+    def utilization(self, group_by, start=date(2024, 1, 1), end=date(2024, 3, 31)):
+        return LeaveSnapshot(start, end, "APPROVED").utilization(group_by)
+
+    def report(self, **params):
+        return self.client.get("/api/leaves/utilization/", params)
+
+    def test_malformed_dates_are_rejected(self):
+        for params in ({"start": "2026"}, {"start": "2024/01/01"}, {"end": "2024-13-01"}, {"start": ""}):
+            with self.subTest(params=params):
+                self.assertEqual(self.report(**params).status_code, 400)
+
+    def test_missing_dates_default_to_the_current_year(self):
+        response = self.report()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["start"], f"{date.today().year}-01-01")
+        self.assertEqual(response.data["end"], f"{date.today().year}-12-31")
+
+    def test_totals_cover_clipped_ranges_only(self):
+        report = self.utilization([])
+
+        # Four active users over 91 days; 9 approved leave days fall inside the period.
+        self.assertEqual(report["headcount"], 4)
+        self.assertEqual(report["leave_days"], 9)
+        self.assertEqual(report["absenteeism_rate"], round(9 / 364, 6))
+        self.assertEqual(report["rows"], [{"requests": 4, "leave_days": 9, "absenteeism_rate": round(9 / 364, 6)}])
+
+    def test_group_by_department(self):
+        rows = self.utilization(["department"])["rows"]
+
+        # The HR user has no department: counted in headcount, no leave row.
+        self.assertEqual(rows, [
+            {"department": "Engineering", "requests": 3, "leave_days": 7, "absenteeism_rate": round(7 / 182, 6)},
+            {"department": "Sales", "requests": 1, "leave_days": 2, "absenteeism_rate": round(2 / 91, 6)},
+        ])
+
+    def test_group_by_month_splits_ranges_by_day(self):
+        rows = self.utilization(["month"])["rows"]
+
+        self.assertEqual(rows, [
+            {"month": "2024-01", "requests": 2, "leave_days": 4, "absenteeism_rate": round(4 / (4 * 31), 6)},
+            {"month": "2024-02", "requests": 1, "leave_days": 3, "absenteeism_rate": round(3 / (4 * 29), 6)},
+            {"month": "2024-03", "requests": 1, "leave_days": 2, "absenteeism_rate": round(2 / (4 * 31), 6)},
+        ])
+
+    def test_group_by_department_and_month(self):
+        rows = self.utilization(["department", "month"])["rows"]
+
+        self.assertEqual(rows, [
+            {"department": "Engineering", "month": "2024-01", "requests": 2, "leave_days": 4, "absenteeism_rate": round(4 / 62, 6)},
+            {"department": "Engineering", "month": "2024-02", "requests": 1, "leave_days": 3, "absenteeism_rate": round(3 / 58, 6)},
+            {"department": "Sales", "month": "2024-03", "requests": 1, "leave_days": 2, "absenteeism_rate": round(2 / 31, 6)},
+        ])
+
+    def test_group_by_designation_and_leave_type(self):
+        rows = self.utilization(["designation", "leave_type"])["rows"]
+
+        self.assertEqual(rows, [
+            {"designation": "Developer", "leave_type": "ANNUAL", "requests": 1, "leave_days": 4, "absenteeism_rate": round(4 / 182, 6)},
+            {"designation": "Developer", "leave_type": "CASUAL", "requests": 1, "leave_days": 2, "absenteeism_rate": round(2 / 182, 6)},
+            {"designation": "Developer", "leave_type": "SICK", "requests": 1, "leave_days": 2, "absenteeism_rate": round(2 / 182, 6)},
+            {"designation": "Tester", "leave_type": "SICK", "requests": 1, "leave_days": 1, "absenteeism_rate": round(1 / 91, 6)},
+        ])
+
+    def test_period_without_leave(self):
+        report = self.utilization(["department", "month"], date(2025, 1, 1), date(2025, 1, 31))
+
+        self.assertEqual(report["headcount"], 4)
+        self.assertEqual(report["leave_days"], 0)
+        self.assertEqual(report["absenteeism_rate"], 0.0)
+        self.assertEqual(report["rows"], [])
+
+    def test_no_users_and_no_leave(self):
+        User.objects.all().delete()
+
+        for group_by in ([], ["department", "leave_type"], ["month"]):
+            with self.subTest(group_by=group_by):
+                report = self.utilization(group_by)
+                self.assertEqual((report["headcount"], report["leave_days"], report["absenteeism_rate"]), (0, 0, 0.0))
+                self.assertEqual(report["rows"], [])
+
+    def test_cached_snapshot_is_reused_until_a_write_commits(self):
+        cache = SnapshotCache()
+        snapshot = cache.get(date(2024, 1, 1), date(2024, 3, 31), "APPROVED")
+        self.assertIs(cache.get(date(2024, 1, 1), date(2024, 3, 31), "APPROVED"), snapshot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            LeaveRequest.objects.filter(status="PENDING").get().delete()
+
+        self.assertIsNot(cache.get(date(2024, 1, 1), date(2024, 3, 31), "APPROVED"), snapshot)
+
+
+class LeaveBatchTests(TestCase):
+    """Batch leave requests are validated, balance-checked and approved as one unit."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.hr = User.objects.create_superuser(email="hr@example.com", password="Hr@12345", first_name="Hr", last_name="Admin")
+        self.employee = User.objects.create_user(email="emp@example.com", password="Emp@12345", first_name="Emp", last_name="Loyee")
+        self.client.force_authenticate(user=self.employee)
+
+    def day(self, offset):
+        return date.today() + timedelta(days=offset)
+
+    def apply(self, *ranges):
+        return self.client.post("/api/leaves/batch/", {
+            "leave_type": "ANNUAL",
+            "reason": "Trip",
+            "ranges": [{"start_date": self.day(start), "end_date": self.day(end)} for start, end in ranges],
+        }, format="json")
+
+    def create_leave(self, start, end, status):
+        return LeaveRequest.objects.create(
+            employee=self.employee, leave_type="SICK", start_date=self.day(start), end_date=self.day(end), status=status, reason="Flu"
+        )
+
+    def assertRejected(self, response):
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(LeaveRequest.objects.filter(batch_id__isnull=False).exists())
+
+    def test_ranges_overlapping_each_other_are_rejected(self):
+        self.assertRejected(self.apply((10, 12), (12, 14)))
+
+    def test_ranges_overlapping_existing_leave_are_rejected(self):
+        self.create_leave(20, 22, "APPROVED")
+
+        self.assertRejected(self.apply((10, 11), (21, 21)))
+
+    def test_too_many_ranges_are_rejected(self):
+        self.assertRejected(self.apply(*[(offset, offset) for offset in range(1, 65, 2)]))
+
+    def test_insufficient_total_balance_is_rejected(self):
+        self.employee.total_leaves = 5
+        self.employee.save()
+
+        # Each range fits the balance on its own; together they do not.
+        self.assertRejected(self.apply((10, 12), (20, 22)))
+
+    def test_pending_request_blocks_a_batch(self):
+        self.create_leave(40, 40, "PENDING")
+
+        self.assertRejected(self.apply((10, 12)))
+
+    def test_batch_members_cannot_be_approved_individually(self):
+        response = self.apply((10, 12), (20, 21))
+        self.assertEqual(response.status_code, 201)
+        leave = LeaveRequest.objects.filter(batch_id=response.data["batch_id"]).first()
+
+        self.client.force_authenticate(user=self.hr)
+        response = self.client.patch(f"/api/leaves/{leave.pk}/status/", {"status": "APPROVED"}, format="json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(LeaveRequest.objects.get(pk=leave.pk).status, "PENDING")
+
+    def test_batch_approval_debits_the_summed_days_once(self):
+        response = self.apply((10, 12), (20, 21))
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["total_days"], 5)
+        batch_id = response.data["batch_id"]
+
+        self.client.force_authenticate(user=self.hr)
+        approved = self.client.patch(f"/api/leaves/batch/{batch_id}/status/", {"status": "APPROVED"}, format="json")
+        repeated = self.client.patch(f"/api/leaves/batch/{batch_id}/status/", {"status": "APPROVED"}, format="json")
+
+        self.assertEqual(approved.status_code, 200)
+        self.assertEqual(repeated.status_code, 404)
+        employee = User.objects.get(pk=self.employee.pk)
+        self.assertEqual((employee.leaves_taken, employee.remaining_leaves), (5, 15))
+        self.assertEqual(set(LeaveRequest.objects.filter(batch_id=batch_id).values_list("status", flat=True)), {"APPROVED"})
+
+
+class ConnectionPoolTests(TransactionTestCase):
+    """The pooled backend must cooperate with the test database lifecycle run by ``manage.py test``."""
+
+    def test_suite_runs_on_pooled_test_database(self):
+        self.assertEqual(connection.vendor, "postgresql")
+        connection.ensure_connection()
+        pool = connection.get_pool()
+        self.assertIs(pool, get_pool(connection.alias, connection.settings_dict))
+        self.assertEqual(pool.labels, (("alias", connection.alias), ("database", connection.settings_dict["NAME"])))
+
+    def test_pool_is_keyed_on_connection_params(self):
+        other = dict(connection.settings_dict, NAME="paysphere_other")
+        self.assertIsNot(get_pool(connection.alias, other), get_pool(connection.alias, connection.settings_dict))
+
+    def test_close_returns_connection_and_close_pools_drains_it(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        connection.close()
+        self.assertFalse(raw.closed)
+        self.assertGreaterEqual(connection.get_pool().stats()["idle"], 1)
+
+        close_pools(connection.alias)
+
+        self.assertTrue(raw.closed)
+        self.assertEqual(connection.get_pool().stats()["idle"], 0)
+
+    def test_connection_is_closed_when_settings_change_before_close(self):
+        connection.ensure_connection()
+        raw = connection.connection
+        original_name = connection.settings_dict["NAME"]
+        connection.settings_dict["NAME"] = "paysphere_other"
+        try:
+            connection.close()
+        finally:
+            connection.settings_dict["NAME"] = original_name
+        self.assertTrue(raw.closed)
+
+
+@override_settings(METRICS_MULTIPROC_DIR=None)
+class MetricsRegistryTests(SimpleTestCase):
+    """Per-thread shards must not accumulate when every request runs on a fresh thread."""
+
+    def test_shards_of_exited_threads_are_folded(self):
+        registry = MetricsRegistry()
+        registry.counter("test_requests_total", "Requests.")
+        registry.histogram("test_duration_seconds", "Latency.")
+
+        def handle_request():
+            registry.inc("test_requests_total", (("method", "GET"),))
+            registry.observe("test_duration_seconds", 0.2)
+
+        for _ in range(200):
+            thread = threading.Thread(target=handle_request)
+            thread.start()
+            thread.join()
+
+        samples = registry.collect()
+        self.assertLessEqual(len(registry._shards), 1)
+        self.assertEqual(samples[("test_requests_total", (("method", "GET"),))], [200])
+        self.assertEqual(samples[("test_duration_seconds", ())][-1], 200)
@@ -1,2 +1,3 @@
 from .user_views import *
-from .leave_views import *
\ No newline at end of file
+from .leave_views import *
+from .metrics_views import *
\ No newline at end of file
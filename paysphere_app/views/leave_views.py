@@ -1,10 +1,15 @@
 from rest_framework import viewsets, permissions, serializers
 from paysphere_app.models.leave_models import LeaveRequest
-from paysphere_app.serializers.leave_serializers import LeaveRequestSerializer
+from paysphere_app.serializers.leave_serializers import LeaveRequestSerializer, LeaveBatchSerializer
+from paysphere_app.models.user_models import User
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.decorators import action
+from django.db import transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from datetime import date
+from paysphere_app.reports import GROUP_FIELDS, snapshot_cache
 
 class LeaveRequestViewSet(viewsets.ModelViewSet):
     queryset = LeaveRequest.objects.all().order_by('-applied_on')  
@@ -46,6 +51,9 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
         if leave_request.employee == user:
             return Response({"error": "You cannot approve your own leave requests."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if leave_request.batch_id:
+            return Response({"error": "This request is part of a batch. Review it through the batch status endpoint."}, status=status.HTTP_400_BAD_REQUEST)
+
         if user.group != "HR":
             return Response({"error": "Only HR can approve or reject leave requests."}, status=status.HTTP_403_FORBIDDEN)
 
@@ -68,6 +76,68 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
 
         return Response({"message": f"Leave request {status_value.lower()} successfully!"}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch_apply(self, request):
+        serializer = LeaveBatchSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            # Lock the employee row so concurrent batches cannot both pass the balance check.
+            employee = User.objects.select_for_update().get(pk=request.user.pk)
+
+            if LeaveRequest.objects.filter(employee=employee, status="PENDING").exists():
+                return Response({"error": "You have a pending leave request. Please wait for approval before submitting a new one."}, status=status.HTTP_400_BAD_REQUEST)
+
+            total_days = serializer.total_days
+            if employee.remaining_leaves < total_days:
+                return Response({"error": "You do not have enough leave balance."}, status=status.HTTP_400_BAD_REQUEST)
+
+            leaves = serializer.save()
+
+        snapshot_cache.invalidate()
+        return Response({
+            "message": "Leave requests created successfully!",
+            "batch_id": leaves[0].batch_id,
+            "total_days": total_days,
+            "leaves": LeaveRequestSerializer(leaves, many=True).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch'], url_path=r'batch/(?P<batch_id>[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})/status')
+    def batch_status(self, request, batch_id=None):
+        user = request.user
+
+        if user.group != "HR":
+            return Response({"error": "Only HR can approve or reject leave requests."}, status=status.HTTP_403_FORBIDDEN)
+
+        status_value = request.data.get("status")
+        if status_value not in ["APPROVED", "REJECTED"]:
+            return Response({"error": "Invalid status. Use 'APPROVED' or 'REJECTED'."}, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            leaves = list(LeaveRequest.objects.select_for_update().filter(batch_id=batch_id, status="PENDING").order_by('start_date'))
+            if not leaves:
+                return Response({"error": "No pending leave requests found for this batch."}, status=status.HTTP_404_NOT_FOUND)
+
+            if leaves[0].employee_id == user.id:
+                return Response({"error": "You cannot approve your own leave requests."}, status=status.HTTP_400_BAD_REQUEST)
+
+            if status_value == "APPROVED":
+                employee = User.objects.select_for_update().get(pk=leaves[0].employee_id)
+                leave_days = sum((leave.end_date - leave.start_date).days + 1 for leave in leaves)
+
+                employee.leaves_taken += leave_days
+                employee.remaining_leaves -= leave_days
+                employee.save()
+
+            LeaveRequest.objects.filter(pk__in=[leave.pk for leave in leaves]).update(
+                status=status_value,
+                reviewed_by=user,
+                reviewed_on=timezone.now()
+            )
+
+        snapshot_cache.invalidate()
+        return Response({"message": f"{len(leaves)} leave requests {status_value.lower()} successfully!"}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='history')
     def leave_history(self, request):
         user = request.user
@@ -89,4 +159,39 @@ class LeaveRequestViewSet(viewsets.ModelViewSet):
 
         all_leaves = LeaveRequest.objects.all().order_by('-applied_on')
         serializer = LeaveRequestSerializer(all_leaves, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='utilization')
+    def utilization_report(self, request):
+        user = request.user
+
+        if user.group != "HR":
+            return Response({"error": "Only HR can view leave utilization reports."}, status=status.HTTP_403_FORBIDDEN)
+
+        today = date.today()
+        period = {"start": date(today.year, 1, 1), "end": date(today.year, 12, 31)}
+        for name in period:
+            # Defaults only apply when the parameter is absent, never to a malformed value.
+            value = request.query_params.get(name)
+            if value is None:
+                continue
+            try:
+                period[name] = parse_date(value)
+            except ValueError:
+                period[name] = None
+            if period[name] is None:
+                return Response({"error": f"Invalid {name} date. Use YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = period["start"], period["end"]
+        if start > end:
+            return Response({"error": "Start date must be before end date."}, status=status.HTTP_400_BAD_REQUEST)
+
+        group_by = [field for field in request.query_params.get("group_by", "department").split(",") if field]
+        if len(set(group_by)) != len(group_by) or any(field not in GROUP_FIELDS for field in group_by):
+            return Response({"error": f"group_by must be distinct values from {list(GROUP_FIELDS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        status_value = request.query_params.get("status", "APPROVED")
+        if status_value not in dict(LeaveRequest.STATUS_CHOICES):
+            return Response({"error": "Invalid status."}, status=status.HTTP_400_BAD_REQUEST)
+
+        snapshot = snapshot_cache.get(start, end, status_value)
+        return Response(snapshot.utilization(group_by), status=status.HTTP_200_OK)
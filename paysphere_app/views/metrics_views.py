@@ -0,0 +1,22 @@
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from ..metrics import registry
+
+
+def metrics_allowed(request):
+    """Allow scrapes from METRICS_ALLOWED_IPS or with the METRICS_BEARER_TOKEN"""
+    token = getattr(settings, "METRICS_BEARER_TOKEN", None)
+    if token:
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        if header.startswith("Bearer ") and hmac.compare_digest(header[len("Bearer "):].encode(), token.encode()):
+            return True
+    return request.META.get("REMOTE_ADDR") in getattr(settings, "METRICS_ALLOWED_IPS", ())
+
+
+def metrics(request):
+    """Expose collected metrics in the Prometheus text format"""
+    if not metrics_allowed(request):
+        return HttpResponseForbidden("Forbidden")
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
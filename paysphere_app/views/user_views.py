@@ -3,13 +3,19 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from django.contrib.auth.hashers import check_password
 from django.http import HttpResponse
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db import transaction
+from django.utils import timezone
 from ..models.user_models import User
-from ..serializers import UserSerializer, UserRegistrationSerializer,UserLoginSerializer
+from ..serializers import UserSerializer, UserRegistrationSerializer,UserLoginSerializer, UserBulkUpdateSerializer
 from ..permissions import IsHRAdmin, IsEmployeeOrReadOnly  
+from ..revocation import revocation_store
+from ..signals import users_bulk_updated
 
 class UserViewSet(viewsets.ModelViewSet):
     """ViewSet for managing users with Role-Based Access Control (RBAC)"""
@@ -20,7 +26,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
     def get_permissions(self):
         """Dynamic permission handling"""
-        if self.action in ['update_profile', 'current_user']:   
+        if self.action in ['update_profile', 'current_user', 'logout']:   
             return [IsAuthenticated()]  
         elif self.action in ['create', 'delete_user', 'activate_user']:
             return [IsHRAdmin()]  
@@ -50,6 +56,23 @@ class UserViewSet(viewsets.ModelViewSet):
             "refresh_token": str(refresh),
         }, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='logout')
+    def logout(self, request):
+        """Revoke the current access token and the given refresh token"""
+        refresh_token = request.data.get("refresh_token")
+        if refresh_token:
+            try:
+                refresh = RefreshToken(refresh_token)
+            except TokenError:
+                return Response({"error": "Invalid refresh token."}, status=status.HTTP_400_BAD_REQUEST)
+            if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(getattr(request.user, api_settings.USER_ID_FIELD)):
+                return Response({"error": "Refresh token does not belong to this user."}, status=status.HTTP_400_BAD_REQUEST)
+            revocation_store.revoke(request.user.id, "LOGOUT", jti=refresh.get(api_settings.JTI_CLAIM))
+
+        if request.auth is not None:
+            revocation_store.revoke(request.user.id, "LOGOUT", jti=request.auth.get(api_settings.JTI_CLAIM))
+        return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
+
     @action(detail=False, methods=['get'], url_path='current')
     def current_user(self, request):
         """Get details of the currently logged-in user."""
@@ -94,6 +117,7 @@ class UserViewSet(viewsets.ModelViewSet):
                 return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
             user.is_active = False  
             user.save()
+            revocation_store.revoke(user.id, "DEACTIVATED")
             return Response({"message": "User deactivated successfully"}, status=status.HTTP_204_NO_CONTENT)
         except ObjectDoesNotExist:
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
@@ -111,6 +135,37 @@ class UserViewSet(viewsets.ModelViewSet):
         except ObjectDoesNotExist:
             return Response({"error": "User not found."}, status=status.HTTP_404_NOT_FOUND)
 
+    @action(detail=False, methods=['post'], url_path='bulk-update')
+    def bulk_update(self, request):
+        """Activate/deactivate or change the role of many users at once (Only HR/Admin)"""
+        if not request.user.has_perm("paysphere_app.change_user"):
+            return Response({"error": "Permission denied."}, status=status.HTTP_403_FORBIDDEN)
+
+        serializer = UserBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        changes = {field: data[field] for field in ("is_active", "group") if field in data}
+        changes["modified_at"] = timezone.now()
+        changes["modified_by"] = request.user.email
+
+        # HR cannot lock themselves out or demote themselves through a bulk change.
+        users = User.objects.exclude(pk=request.user.pk)
+        if "ids" in data:
+            users = users.filter(pk__in=data["ids"])
+        else:
+            users = users.filter(department=data["department"])
+
+        with transaction.atomic():
+            user_ids = list(users.select_for_update().values_list("id", flat=True))
+            updated = User.objects.filter(pk__in=user_ids).update(**changes)
+            if data.get("is_active") is False and user_ids:
+                revocation_store.revoke_users(user_ids, "DEACTIVATED")
+
+        if user_ids:
+            users_bulk_updated.send(sender=User, user_ids=user_ids, fields=sorted(changes))
+        return Response({"message": "Users updated successfully", "updated": updated}, status=status.HTTP_200_OK)
+
 
 def home(request):
     """Simple home response"""
@@ -50,6 +50,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'paysphere_app.middleware.MetricsMiddleware',
+    'paysphere_app.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,13 +87,21 @@ WSGI_APPLICATION = 'paysphere_pro.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': 'paysphere_app.db.backends.postgresql_pool',
         'NAME': os.getenv('PGDATABASE'),
         'USER': os.getenv('PGUSER'),
         'PASSWORD': os.getenv('PGPASSWORD'),
         'HOST': os.getenv('PGHOST'),
         'PORT': os.getenv('PORT'),
-
+        # Connections are returned to the pool at the end of each request,
+        # so Django itself must not keep them open.
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', '10')),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', '5')),
+            'MAX_IDLE': float(os.getenv('DB_POOL_MAX_IDLE', '300')),
+            'HEALTH_CHECK_AFTER': float(os.getenv('DB_POOL_HEALTH_CHECK_AFTER', '5')),
+        },
     }
 }
 
@@ -147,9 +157,54 @@ AUTHENTICATION_BACKENDS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'paysphere_app.authentication.RevocationAwareJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
-}
\ No newline at end of file
+}
+
+# Metrics
+# Point METRICS_MULTIPROC_DIR at a directory shared by all gunicorn/uvicorn
+# workers (and cleared on deploy) so /metrics aggregates every worker. Call
+# paysphere_app.metrics.mark_process_dead(worker.pid) from gunicorn's
+# child_exit hook so gauges from killed workers are dropped.
+
+METRICS_MULTIPROC_DIR = os.getenv('METRICS_MULTIPROC_DIR')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '1.0'))
+# /metrics is only served to these addresses or to requests carrying
+# "Authorization: Bearer <METRICS_BEARER_TOKEN>".
+METRICS_ALLOWED_IPS = [ip for ip in os.getenv('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',') if ip]
+METRICS_BEARER_TOKEN = os.getenv('METRICS_BEARER_TOKEN')
+
+# Profiling
+# Requests are profiled when they carry a valid signed X-Paysphere-Profile
+# header (see paysphere_app.profiling.sign_profile_request) or are picked by
+# PROFILING_SAMPLE_RATE. Aggregate with `manage.py aggregate_profiles`.
+
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+PROFILING_INTERVAL = float(os.getenv('PROFILING_INTERVAL', '0.005'))
+PROFILING_DIR = os.getenv('PROFILING_DIR', str(BASE_DIR / 'profiles'))
+PROFILING_MAX_BYTES = int(os.getenv('PROFILING_MAX_BYTES', str(50 * 1024 * 1024)))
+PROFILING_TOKEN_MAX_AGE = 300
+
+# Token revocation
+# Each worker checks tokens against an in-memory bloom filter and only
+# queries TokenRevocation on a filter hit.
+
+TOKEN_REVOCATION_BLOOM_CAPACITY = 100000
+TOKEN_REVOCATION_BLOOM_ERROR_RATE = 0.001
+TOKEN_REVOCATION_REFRESH_INTERVAL = 5
+# Re-read this many seconds of revocations on each refresh so rows from
+# transactions that commit late are still picked up.
+TOKEN_REVOCATION_REFRESH_GRACE = 300
+TOKEN_REVOCATION_REBUILD_INTERVAL = 3600
+
+# Leave analytics
+# Columnar report snapshots are cached per worker. Each report request
+# reads a shared version counter that every leave or user write bumps (see
+# paysphere_app.reports.data_version), so writes from any worker invalidate
+# them; the TTL bounds writes made outside the ORM.
+
+REPORT_SNAPSHOT_TTL = 300
+REPORT_SNAPSHOT_CACHE_SIZE = 8
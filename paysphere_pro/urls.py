@@ -19,7 +19,7 @@ from django.urls import path, include
 from drf_yasg.views import get_schema_view
 from drf_yasg import openapi
 from rest_framework import permissions
-from paysphere_app.views import home
+from paysphere_app.views import home, metrics
 
 schema_view = get_schema_view(
     openapi.Info(
@@ -40,6 +40,7 @@ urlpatterns = [
     path('api/', include('paysphere_app.urls')),
     path('docs/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
     path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    path('metrics', metrics, name='metrics'),
     path("", home),
 
 ]